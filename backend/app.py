@@ -3,10 +3,7 @@ from flask import Flask, request, jsonify, send_file, g
 from flask_cors import CORS
 from werkzeug.security import generate_password_hash, check_password_hash
 import jwt
-from datetime import datetime, timedelta, timezone
-import psycopg2
-import pandas as pd
-import pdfplumber
+from datetime import datetime, timedelta, timezone, date
 import re
 from io import StringIO, BytesIO
 import smtplib
@@ -16,8 +13,23 @@ from email.mime.base import MIMEBase
 from email import encoders
 import json
 from functools import wraps
+from contextlib import contextmanager
 import os
 import csv
+import gzip
+import hashlib
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Histogram, generate_latest, multiprocess
+try:
+    import brotli  # Optional: enables br response compression
+except ImportError:
+    brotli = None
+# pandas, pdfplumber, openpyxl and psycopg2 are imported inside the functions that
+# use them so that workers only pay for them on the routes that need them.
 # tabula is no longer needed
 
 # --- App Initialization ---
@@ -38,15 +50,87 @@ else:
         'port': '5432'
     }
 
+SMTP_HOST = os.environ.get('SMTP_HOST', 'smtp.gmail.com')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', 587))
+SMTP_STARTTLS = os.environ.get('SMTP_STARTTLS', '1') == '1'
+
+# history is range-partitioned by month on sent_at; see the partitioning helpers below.
+HISTORY_PARTITIONS_AHEAD = int(os.environ.get('HISTORY_PARTITIONS_AHEAD', 3))
+HISTORY_RETENTION_MONTHS = int(os.environ.get('HISTORY_RETENTION_MONTHS', 24))
+HISTORY_ARCHIVE_DIR = os.environ.get('HISTORY_ARCHIVE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'history_archive'))
+
+# Password hashing runs in a bounded process pool; see the password helpers below.
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 2))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 32))
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+LOGIN_MAX_FAILURES = int(os.environ.get('LOGIN_MAX_FAILURES', 5))
+LOGIN_FAILURE_WINDOW = int(os.environ.get('LOGIN_FAILURE_WINDOW', 300))
+
+# JSON bodies at least this large are gzip/brotli compressed when the client accepts it.
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+
+# Opt-in: profile every request and dump the ones slower than this many ms (needs pyinstrument).
+PROFILE_SLOW_REQUESTS_MS = float(os.environ.get('PROFILE_SLOW_REQUESTS_MS', 0))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles'))
+
+# --- Metrics & Instrumentation ---
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Under gunicorn, gunicorn.conf.py sets PROMETHEUS_MULTIPROC_DIR before the app is
+# imported, so every worker writes its samples there and /metrics aggregates them.
+REQUEST_LATENCY = Histogram('monitormail_request_duration_seconds', 'HTTP request latency by route.', ('method', 'route', 'status'), buckets=LATENCY_BUCKETS)
+SPAN_LATENCY = Histogram('monitormail_span_duration_seconds', 'Time spent in instrumented operations.', ('span',), buckets=LATENCY_BUCKETS)
+
+@contextmanager
+def timed(span):
+    """Records the duration of the block (or decorated function) under `span`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        SPAN_LATENCY.labels(span).observe(time.perf_counter() - start)
+
+_SQL_VERBS = ('select', 'insert', 'update', 'delete', 'copy')
+_timed_cursor_class = None
+
+def _get_timed_cursor_class():
+    """psycopg2 cursor that times every statement as a db.<verb> span."""
+    global _timed_cursor_class
+    if _timed_cursor_class is None:
+        import psycopg2.extensions
+
+        def span_for(query):
+            text = query.decode() if isinstance(query, bytes) else str(query)
+            verb = text.lstrip().split(None, 1)[0].lower() if text.strip() else ''
+            return f"db.{verb if verb in _SQL_VERBS else 'other'}"
+
+        class TimedCursor(psycopg2.extensions.cursor):
+            def execute(self, query, vars=None):
+                with timed(span_for(query)):
+                    return super().execute(query, vars)
+
+            def executemany(self, query, vars_list):
+                with timed(span_for(query)):
+                    return super().executemany(query, vars_list)
+
+            def copy_expert(self, sql, file, size=8192):
+                with timed('db.copy'):
+                    return super().copy_expert(sql, file, size)
+
+        _timed_cursor_class = TimedCursor
+    return _timed_cursor_class
+
 # --- DB Connection Helper ---
 def get_db_connection():
+    import psycopg2
     if isinstance(DB_CONFIG, str): 
-        conn = psycopg2.connect(DB_CONFIG)
+        conn = psycopg2.connect(DB_CONFIG, cursor_factory=_get_timed_cursor_class())
     else: 
-        conn = psycopg2.connect(**DB_CONFIG)
+        conn = psycopg2.connect(**DB_CONFIG, cursor_factory=_get_timed_cursor_class())
     return conn
 
 # --- DB Helper for Analytics (Unchanged) ---
+@timed('update_dashboard_analytics')
 def update_dashboard_analytics():
     try:
         conn = get_db_connection()
@@ -70,6 +154,485 @@ def update_dashboard_analytics():
     except Exception as e:
         print(f"Error updating analytics: {e}")
 
+def preload_heavy_modules():
+    """Imports the lazily loaded dependencies up front. Called by the production
+    entry point before forking so every worker shares them."""
+    import psycopg2, psycopg2.errors, psycopg2.sql
+    import pandas, pdfplumber, openpyxl
+
+# --- History Partitioning & Retention ---
+HISTORY_PARTITION_RE = re.compile(r'^history_(\d{4})_(\d{2})$')
+_history_partitions_checked_for = None
+
+def _month_start(d):
+    return date(d.year, d.month, 1)
+
+def _add_months(d, months):
+    m = d.month - 1 + months
+    return date(d.year + m // 12, m % 12 + 1, 1)
+
+def _history_partition_name(month_start):
+    return f"history_{month_start.year:04d}_{month_start.month:02d}"
+
+def _create_history_partition(cursor, month_start):
+    from psycopg2 import sql
+    cursor.execute(
+        sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF history FOR VALUES FROM (%s) TO (%s)").format(sql.Identifier(_history_partition_name(month_start))),
+        (month_start.isoformat(), _add_months(month_start, 1).isoformat())
+    )
+
+def migrate_history_to_partitions(conn):
+    """Converts a plain `history` table into monthly range partitions on sent_at.
+    Returns False if the table is already partitioned."""
+    from psycopg2 import sql
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('history')")
+            row = cursor.fetchone()
+            if not row:
+                raise RuntimeError('history table does not exist')
+            if row[0] == 'p':
+                return False
+
+            cursor.execute("LOCK TABLE history IN ACCESS EXCLUSIVE MODE")
+            # sent_at joins the primary key, so NULLs can't be copied across.
+            cursor.execute("SELECT count(*) FROM history WHERE sent_at IS NULL")
+            null_rows = cursor.fetchone()[0]
+            if null_rows:
+                raise RuntimeError(f"history has {null_rows} rows with NULL sent_at; set or delete them before partitioning")
+
+            cursor.execute("SELECT pg_get_serial_sequence('history', 'id')")
+            id_sequence = cursor.fetchone()[0]
+            cursor.execute("""
+                SELECT c.relname, pg_get_indexdef(ix.indexrelid), ix.indisunique, ix.indisprimary
+                FROM pg_index ix JOIN pg_class c ON c.oid = ix.indexrelid
+                WHERE ix.indrelid = 'history'::regclass ORDER BY c.relname
+            """)
+            old_indexes = cursor.fetchall()
+
+            cursor.execute("ALTER TABLE history RENAME TO history_unpartitioned")
+            # Index names are schema-wide: move the old ones aside so theirs can be reused.
+            for name, _, _, _ in old_indexes:
+                cursor.execute(sql.SQL("ALTER INDEX {} RENAME TO {}").format(sql.Identifier(name), sql.Identifier(f"{name[:48]}_unpartitioned")))
+            cursor.execute("CREATE TABLE history (LIKE history_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS) PARTITION BY RANGE (sent_at)")
+            # The partition key has to be part of the primary key on a partitioned table.
+            cursor.execute("ALTER TABLE history ADD PRIMARY KEY (id, sent_at)")
+            cursor.execute("CREATE INDEX history_sent_at_idx ON history (sent_at)")
+            for name, definition, is_unique, is_primary in old_indexes:
+                if is_primary:
+                    continue
+                if is_unique:
+                    # A unique index on a partitioned table must include sent_at; it can't be carried over as-is.
+                    print(f"Not recreating unique index {name} on partitioned history: {definition}")
+                    continue
+                # The definition names `history`, which is now the partitioned table.
+                cursor.execute(definition)
+            if id_sequence:
+                # Keep the id sequence alive once the old table is dropped.
+                cursor.execute(sql.SQL("ALTER SEQUENCE {} OWNED BY history.id").format(sql.SQL(id_sequence)))
+
+            cursor.execute("SELECT min(sent_at) FROM history_unpartitioned")
+            oldest = cursor.fetchone()[0]
+            month = _month_start(oldest or date.today())
+            last = _add_months(_month_start(date.today()), HISTORY_PARTITIONS_AHEAD)
+            while month <= last:
+                _create_history_partition(cursor, month)
+                month = _add_months(month, 1)
+
+            cursor.execute("INSERT INTO history SELECT * FROM history_unpartitioned")
+            cursor.execute("DROP TABLE history_unpartitioned")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return True
+
+def ensure_history_partitions():
+    """Creates this month's partition and the next HISTORY_PARTITIONS_AHEAD ones.
+    Only touches the database once per calendar month per process, and skips an
+    unpartitioned history table."""
+    global _history_partitions_checked_for
+    this_month = _month_start(date.today())
+    if _history_partitions_checked_for == this_month:
+        return
+    conn = None
+    try:
+        conn = get_db_connection()
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('history')")
+            row = cursor.fetchone()
+            if row and row[0] == 'p':
+                for offset in range(HISTORY_PARTITIONS_AHEAD + 1):
+                    _create_history_partition(cursor, _add_months(this_month, offset))
+            else:
+                # Nothing to do until `flask history-maintenance` has partitioned the table;
+                # the migration itself creates the partitions ahead of this month.
+                print("history is not partitioned yet; run `flask history-maintenance`.")
+        conn.commit()
+        conn.close()
+        _history_partitions_checked_for = this_month
+    except Exception as e:
+        if conn: conn.rollback(); conn.close()
+        print(f"Error creating history partitions: {e}")
+
+def archive_expired_history_partitions():
+    """Writes each partition older than HISTORY_RETENTION_MONTHS to HISTORY_ARCHIVE_DIR
+    as a gzipped CSV, then detaches and drops it. Returns the archived file paths."""
+    from psycopg2 import sql
+    cutoff = _add_months(_month_start(date.today()), -HISTORY_RETENTION_MONTHS)
+    archived = []
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = 'history'::regclass ORDER BY c.relname")
+            partitions = [row[0] for row in cursor.fetchall()]
+
+        os.makedirs(HISTORY_ARCHIVE_DIR, exist_ok=True)
+        for name in partitions:
+            match = HISTORY_PARTITION_RE.match(name)
+            if not match:
+                continue
+            month_start = date(int(match.group(1)), int(match.group(2)), 1)
+            if _add_months(month_start, 1) > cutoff:
+                continue
+
+            partition = sql.Identifier(name)
+            archive_path = os.path.join(HISTORY_ARCHIVE_DIR, f"{name}.csv.gz")
+            tmp_path = archive_path + '.tmp'
+            # Copy while the partition is still attached and locked against writes; it is
+            # only detached and dropped, in the same transaction, once the archive is in place.
+            # Any failure before the commit leaves the partition attached for the next run.
+            try:
+                with conn.cursor() as cursor, gzip.open(tmp_path, 'wt', encoding='utf-8', newline='') as archive:
+                    cursor.execute(sql.SQL("LOCK TABLE {} IN SHARE MODE").format(partition))
+                    cursor.copy_expert(sql.SQL("COPY {} TO STDOUT WITH (FORMAT csv, HEADER)").format(partition).as_string(conn), archive)
+                os.replace(tmp_path, archive_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+            with conn.cursor() as cursor:
+                cursor.execute(sql.SQL("ALTER TABLE history DETACH PARTITION {}").format(partition))
+                cursor.execute(sql.SQL("DROP TABLE {}").format(partition))
+                # Detaching does not fire the history version trigger, so invalidate ETags here.
+                cursor.execute("SELECT to_regclass('table_versions') IS NOT NULL")
+                if cursor.fetchone()[0]:
+                    cursor.execute("UPDATE table_versions SET version = version + 1 WHERE table_name = 'history'")
+            conn.commit()
+            archived.append(archive_path)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return archived
+
+@app.cli.command('history-maintenance')
+def history_maintenance_command():
+    """Partitions history if needed, installs the ETag version counters, creates
+    upcoming partitions and archives expired ones."""
+    conn = get_db_connection()
+    try:
+        if migrate_history_to_partitions(conn):
+            print("Converted history to monthly partitions.")
+        # Idempotent; also reinstalls the history trigger dropped with the old table.
+        install_table_version_triggers(conn)
+    finally:
+        conn.close()
+    ensure_history_partitions()
+    for path in archive_expired_history_partitions():
+        print(f"Archived {path}")
+
+# --- Request Metrics, Profiling & /metrics ---
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.profiler = None
+    if PROFILE_SLOW_REQUESTS_MS > 0:
+        try:
+            from pyinstrument import Profiler
+            g.profiler = Profiler(interval=0.001)
+            g.profiler.start()
+        except Exception as e:
+            print(f"Error starting profiler: {e}")
+
+def _dump_profile(profiler, elapsed_ms):
+    profiler.stop()
+    if elapsed_ms < PROFILE_SLOW_REQUESTS_MS:
+        return
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        route = re.sub(r'[^A-Za-z0-9]+', '_', request.path).strip('_') or 'root'
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        path = os.path.join(PROFILE_DIR, f"{stamp}-{request.method}-{route}-{int(elapsed_ms)}ms.txt")
+        with open(path, 'w') as f:
+            f.write(profiler.output_text(unicode=True, color=False))
+    except Exception as e:
+        print(f"Error writing profile: {e}")
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.get('request_start')
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    REQUEST_LATENCY.labels(request.method, route, str(response.status_code)).observe(elapsed)
+    if g.get('profiler') is not None:
+        _dump_profile(g.profiler, elapsed * 1000)
+        g.profiler = None
+    return response
+
+@app.teardown_request
+def stop_profiler(exc):
+    # after_request is skipped when a view raises; don't leave the profiler running.
+    profiler = g.get('profiler')
+    if profiler is not None and profiler.is_running:
+        profiler.stop()
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return app.response_class(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+# --- Table Versions, Conditional GET & Compression ---
+VERSIONED_TABLES = ('templates', 'teachers', 'students', 'history')
+_table_versions_installed = None
+
+def install_table_version_triggers(conn):
+    """Creates table_versions and a statement-level trigger on each versioned table
+    that bumps its counter on any write. Safe to run repeatedly."""
+    from psycopg2 import sql
+    with conn.cursor() as cursor:
+        cursor.execute("CREATE TABLE IF NOT EXISTS table_versions (table_name TEXT PRIMARY KEY, version BIGINT NOT NULL DEFAULT 0)")
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO table_versions (table_name, version) VALUES (TG_TABLE_NAME, 1)
+                ON CONFLICT (table_name) DO UPDATE SET version = table_versions.version + 1;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        for table in VERSIONED_TABLES:
+            cursor.execute("INSERT INTO table_versions (table_name) VALUES (%s) ON CONFLICT DO NOTHING", (table,))
+            trigger = sql.Identifier(f"{table}_bump_version")
+            cursor.execute(sql.SQL("DROP TRIGGER IF EXISTS {} ON {}").format(trigger, sql.Identifier(table)))
+            cursor.execute(
+                sql.SQL("CREATE TRIGGER {} AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {} FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()").format(trigger, sql.Identifier(table))
+            )
+    conn.commit()
+
+@app.cli.command('init-table-versions')
+def init_table_versions_command():
+    """Installs the version counters used for ETags on the read endpoints."""
+    conn = get_db_connection()
+    try:
+        install_table_version_triggers(conn)
+        print(f"Version triggers installed on: {', '.join(VERSIONED_TABLES)}")
+    finally:
+        conn.close()
+
+def table_etag(cursor, table):
+    """Strong ETag for a read of `table`, keyed on its version counter and the
+    request's query string. Returns None if versions are not installed."""
+    global _table_versions_installed
+    try:
+        if _table_versions_installed is None:
+            # Checked once per process so an uninstalled table costs nothing per poll.
+            cursor.execute("SELECT to_regclass('table_versions') IS NOT NULL")
+            _table_versions_installed = cursor.fetchone()[0]
+            if not _table_versions_installed:
+                print("table_versions is missing; ETags are disabled until `flask init-table-versions` is run and the app restarted.")
+        if not _table_versions_installed:
+            return None
+        cursor.execute("SELECT version FROM table_versions WHERE table_name = %s", (table,))
+        row = cursor.fetchone()
+    except Exception as e:
+        cursor.connection.rollback()
+        print(f"Error reading table version for {table}: {e}")
+        return None
+    if not row:
+        return None
+    query_digest = hashlib.sha1(request.query_string).hexdigest()[:12]
+    return f"{table}-{row[0]}-{query_digest}"
+
+def matching_etag(etag):
+    """Returns the representation of `etag` named in If-None-Match, if any.
+    Compressed responses carry an encoding suffix, so those count too."""
+    if not etag:
+        return None
+    for candidate in (etag, f"{etag}-gzip", f"{etag}-br"):
+        if request.if_none_match.contains(candidate):
+            return candidate
+    return None
+
+def not_modified_response(etag):
+    response = app.response_class(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    # Must match the Vary of the 200 being revalidated (see compress_response).
+    response.vary.add('Accept-Encoding')
+    return response
+
+def etag_json_response(payload, etag):
+    response = jsonify(payload)
+    if etag:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def _accepted_encoding():
+    accept = request.accept_encodings
+    if brotli is not None and accept['br']:
+        return 'br'
+    if accept['gzip']:
+        return 'gzip'
+    return None
+
+@app.after_request
+def compress_response(response):
+    if (response.status_code != 200 or response.direct_passthrough or response.mimetype != 'application/json'
+            or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+    encoding = _accepted_encoding()
+    if not encoding:
+        return response
+    if encoding == 'br':
+        response.set_data(brotli.compress(body, quality=5))
+    else:
+        response.set_data(gzip.compress(body, compresslevel=6))
+    response.headers['Content-Encoding'] = encoding
+    etag, is_weak = response.get_etag()
+    if etag:
+        # A strong ETag identifies the exact bytes, so each encoding gets its own.
+        response.set_etag(f"{etag}-{encoding}", weak=is_weak)
+    return response
+
+# --- Password Hashing Pool & Login Throttling ---
+class PasswordHashBusy(Exception):
+    pass
+
+_password_pool = None
+_password_pool_lock = threading.Lock()
+_password_slots = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
+_login_failures_table_ready = False
+
+def _get_password_pool():
+    global _password_pool
+    with _password_pool_lock:
+        if _password_pool is None:
+            # spawn keeps the workers clear of the server's threads and open DB sockets.
+            _password_pool = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _password_pool
+
+def _discard_password_pool(pool):
+    """Drops a pool whose worker died (e.g. OOM-killed) so the next job spawns a
+    fresh one. Only the pool the caller saw is discarded, so a replacement started
+    by another thread is left alone."""
+    global _password_pool
+    with _password_pool_lock:
+        if _password_pool is pool:
+            _password_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _run_password_job(fn, *args):
+    """Runs a CPU-bound hashing call in the pool, refusing work once
+    PASSWORD_HASH_MAX_PENDING jobs are already queued or running."""
+    if not _password_slots.acquire(blocking=False):
+        raise PasswordHashBusy()
+    pool = _get_password_pool()
+    try:
+        future = pool.submit(fn, *args)
+    except BrokenProcessPool:
+        _password_slots.release()
+        _discard_password_pool(pool)
+        raise PasswordHashBusy()
+    except Exception:
+        _password_slots.release()
+        raise
+    # The slot belongs to the job, not the caller: it is only freed once the job has
+    # finished or been cancelled, so timed-out requests can't pile work up in the pool.
+    future.add_done_callback(lambda _: _password_slots.release())
+    try:
+        return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+    except FuturesTimeoutError:
+        future.cancel()
+        # A hash that can't finish in time means the pool is saturated; callers
+        # answer that the same way as a full queue.
+        raise PasswordHashBusy()
+    except BrokenProcessPool:
+        _discard_password_pool(pool)
+        raise PasswordHashBusy()
+
+def hash_password(password):
+    return _run_password_job(generate_password_hash, password, 'pbkdf2:sha256')
+
+def verify_password(password_hash, password):
+    return _run_password_job(check_password_hash, password_hash, password)
+
+def password_busy_response():
+    response = jsonify({'message': 'Server is busy, please try again shortly.'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+# Failed logins are counted in PostgreSQL so every gunicorn worker enforces the same
+# per-account limit. Each row holds a fixed window that restarts once it has expired.
+def _ensure_login_failures_table(cursor):
+    global _login_failures_table_ready
+    if _login_failures_table_ready:
+        return
+    cursor.execute("CREATE TABLE IF NOT EXISTS login_failures (email TEXT PRIMARY KEY, failures INTEGER NOT NULL, window_start TIMESTAMPTZ NOT NULL)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS login_failures_window_start_idx ON login_failures (window_start)")
+    cursor.connection.commit()
+    _login_failures_table_ready = True
+
+def _login_failure_count(cursor, email):
+    """Failures for `email` in its current window (0 once the window has expired)."""
+    _ensure_login_failures_table(cursor)
+    cursor.execute(
+        "SELECT failures FROM login_failures WHERE email = %s AND window_start > NOW() - make_interval(secs => %s)",
+        (email, LOGIN_FAILURE_WINDOW)
+    )
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+def _record_login_failure(email):
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            _ensure_login_failures_table(cursor)
+            cursor.execute(
+                """INSERT INTO login_failures (email, failures, window_start) VALUES (%(email)s, 1, NOW())
+                   ON CONFLICT (email) DO UPDATE SET
+                       failures = CASE WHEN login_failures.window_start <= NOW() - make_interval(secs => %(window)s) THEN 1 ELSE login_failures.failures + 1 END,
+                       window_start = CASE WHEN login_failures.window_start <= NOW() - make_interval(secs => %(window)s) THEN NOW() ELSE login_failures.window_start END""",
+                {'email': email, 'window': LOGIN_FAILURE_WINDOW}
+            )
+            # Keeps rows for guessed usernames from piling up.
+            cursor.execute("DELETE FROM login_failures WHERE window_start <= NOW() - make_interval(secs => %s)", (LOGIN_FAILURE_WINDOW,))
+        conn.commit()
+    finally:
+        conn.close()
+
+def _clear_login_failures(email):
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM login_failures WHERE email = %s", (email,))
+        conn.commit()
+    finally:
+        conn.close()
+
 # --- Authentication Decorators (Unchanged) ---
 def token_required(f):
     @wraps(f)
@@ -102,7 +665,9 @@ def admin_required(f):
     return decorated
     
 # --- PDF Processing Logic (Original for Low Attendance Workflow) ---
+@timed('pdf.process_pdf_to_csv_string')
 def process_pdf_to_csv_string(pdf_file):
+    import pdfplumber
     full_text = ""
     with pdfplumber.open(pdf_file) as pdf:
         for page in pdf.pages:
@@ -139,16 +704,28 @@ def login():
     auth = request.authorization
     if not auth or not auth.username or not auth.password:
         return jsonify({'message': 'Could not verify'}), 401
+    email = auth.username.strip().lower()
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
+        failure_count = _login_failure_count(cursor, email)
+        if failure_count >= LOGIN_MAX_FAILURES:
+            cursor.close()
+            conn.close()
+            response = jsonify({'message': 'Too many failed login attempts. Try again later.'})
+            response.headers['Retry-After'] = str(LOGIN_FAILURE_WINDOW)
+            return response, 429
         cursor.execute("SELECT id, email, password_hash, name, is_admin FROM teachers WHERE email = %s", (auth.username,))
       
         teacher = cursor.fetchone()
         cursor.close()
         conn.close()
-        if not teacher: return jsonify({'message': 'User not found'}), 401
-        if check_password_hash(teacher[2], auth.password):
+        if not teacher:
+            _record_login_failure(email)
+            return jsonify({'message': 'User not found'}), 401
+        if verify_password(teacher[2], auth.password):
+            if failure_count:
+                _clear_login_failures(email)
             token = jwt.encode({
                 'id': teacher[0],
                 'user': teacher[1], 
@@ -162,7 +739,10 @@ def login():
                 'user': {'id': teacher[0], 'email': teacher[1], 'name': teacher[3], 'is_admin': teacher[4]}
             })
  
+        _record_login_failure(email)
         return jsonify({'message': 'Incorrect password'}), 401
+    except PasswordHashBusy:
+        return password_busy_response()
     except Exception as e:
         return jsonify({'message': f'Database connection error: {e}'}), 500
 
@@ -181,20 +761,24 @@ def upload_pdf():
 @app.route('/api/sort-attendance', methods=['POST'])
 @token_required
 def sort_attendance():
+    import pandas as pd
     csv_data = request.get_json().get('csv_data', '')
     try:
-        df = pd.read_csv(StringIO(csv_data))
-        df['Percentage'] = pd.to_numeric(df['Percentage'], errors='coerce')
-      
-        df.dropna(subset=['Percentage'], inplace=True) 
-        low_attendance_df = df[df['Percentage'] < 75] 
-        return jsonify({'sorted_csv_data': low_attendance_df.to_csv(index=False)})
+        with timed('pandas.sort_attendance'):
+            df = pd.read_csv(StringIO(csv_data))
+            df['Percentage'] = pd.to_numeric(df['Percentage'], errors='coerce')
+          
+            df.dropna(subset=['Percentage'], inplace=True) 
+            low_attendance_df = df[df['Percentage'] < 75] 
+            sorted_csv_data = low_attendance_df.to_csv(index=False)
+        return jsonify({'sorted_csv_data': sorted_csv_data})
     except Exception as e:
         return jsonify({'error': f'Failed to sort data: {e}'}), 500
 
 @app.route('/api/fetch-details', methods=['POST'])
 @token_required
 def fetch_details():
+    import pandas as pd
     sorted_csv = request.get_json().get('sorted_csv_data', '')
     conn = None 
     try:
@@ -211,7 +795,8 @@ def fetch_details():
         conn.close() 
 
         details_map = {row[0]: {'name': row[1], 'student_email': row[2], 'parent_email': row[3]} for row in student_details}
-        grouped_subjects = df.groupby('Reg.No')[['Subject', 'Percentage']].apply(lambda x: x.to_dict('records')).reset_index(name='subjects')
+        with timed('pandas.fetch_details_group'):
+            grouped_subjects = df.groupby('Reg.No')[['Subject', 'Percentage']].apply(lambda x: x.to_dict('records')).reset_index(name='subjects')
         
         merged_data = []
         for _, row in grouped_subjects.iterrows():
@@ -267,8 +852,9 @@ def send_emails_endpoint():
                 return email_str.strip() 
             return None
 
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
+        ensure_history_partitions()
+        server = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
+        if SMTP_STARTTLS: server.starttls()
         server.login(sender_email, sender_password)
         results = []
         conn = get_db_connection()
@@ -317,7 +903,8 @@ def send_emails_endpoint():
                     part.add_header('Content-Disposition', f'attachment; filename="{attachment_filename}"')
                     msg.attach(part)
 
-                server.sendmail(sender_email, recipients, msg.as_string())
+                with timed('smtp.sendmail'):
+                    server.sendmail(sender_email, recipients, msg.as_string())
                
                 results.append({'reg_no': student['reg_no'], 'status': 'success'})
 
@@ -388,8 +975,9 @@ def alert_all_students():
            
             return jsonify({'success': False, 'reason': 'No students found in database.'}), 404
 
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
+        ensure_history_partitions()
+        server = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
+        if SMTP_STARTTLS: server.starttls()
         server.login(sender_email, sender_password)
         results = {'success_count': 0, 'fail_count': 0, 'failed_regs': []}
         
@@ -433,7 +1021,8 @@ def alert_all_students():
                     part.add_header('Content-Disposition', f'attachment; filename="{attachment_filename}"')
                     msg.attach(part)
 
-                server.sendmail(sender_email, recipients, msg.as_string())
+                with timed('smtp.sendmail'):
+                    server.sendmail(sender_email, recipients, msg.as_string())
                 results['success_count'] += 1
 
          
@@ -500,11 +1089,17 @@ def get_teachers():
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
+        etag = table_etag(cursor, 'teachers')
+        matched = matching_etag(etag)
+        if matched:
+            cursor.close()
+            conn.close()
+            return not_modified_response(matched)
         cursor.execute("SELECT id, name, email, is_admin FROM teachers ORDER BY name")
         teachers = [{'id': row[0], 'name': row[1], 'email': row[2], 'is_admin': row[3]} for row in cursor.fetchall()]
         cursor.close()
         conn.close()
-        return jsonify(teachers)
+        return etag_json_response(teachers, etag)
     except Exception as e:
         if conn: conn.close()
         return jsonify({'error': str(e)}), 500
@@ -512,6 +1107,7 @@ def get_teachers():
 @app.route('/api/teachers', methods=['POST'])
 @admin_required
 def create_teacher():
+    import psycopg2.errors
    
     conn = None
     try:
@@ -523,7 +1119,7 @@ def create_teacher():
         if not name or not email or not password:
    
             return jsonify({'message': 'Missing data'}), 400
-        hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
+        hashed_password = hash_password(password)
         conn = get_db_connection()
         cursor = conn.cursor()
         cursor.execute("INSERT INTO teachers (name, email, password_hash, is_admin) VALUES (%s, %s, %s, %s)",(name, email, hashed_password, is_admin))
@@ -532,6 +1128,8 @@ def create_teacher():
         cursor.close()
         conn.close()
         return jsonify({'message': 'Teacher created successfully'}), 201
+    except PasswordHashBusy:
+        return password_busy_response()
     except psycopg2.errors.UniqueViolation:
         if conn: conn.rollback(); conn.close()
         return jsonify({'message': 'Email already exists'}), 409
@@ -553,10 +1151,10 @@ def update_teacher(teacher_id):
         password = data.get('password')
         if not name or not email or is_admin is None:
             return jsonify({'message': 'Missing required fields'}), 400
+        hashed_password = hash_password(password) if password else None
         conn = get_db_connection()
         cursor = conn.cursor()
-        if password:
-            hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
+        if hashed_password:
             cursor.execute("UPDATE teachers SET name = %s, email = %s, is_admin = %s, password_hash = %s WHERE id = %s",(name, email, is_admin, hashed_password, teacher_id))
         else:
             cursor.execute("UPDATE teachers SET name = %s, email = %s, is_admin = %s WHERE id = %s",(name, email, is_admin, teacher_id))
@@ -565,6 +1163,8 @@ def update_teacher(teacher_id):
         cursor.close()
         conn.close()
         return jsonify({'message': 'Teacher updated successfully'})
+    except PasswordHashBusy:
+        return password_busy_response()
     except Exception as e:
         if conn: conn.rollback(); conn.close()
         return jsonify({'error': str(e)}), 500
@@ -598,6 +1198,12 @@ def get_students():
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
+        etag = table_etag(cursor, 'students')
+        matched = matching_etag(etag)
+        if matched:
+            cursor.close()
+            conn.close()
+            return not_modified_response(matched)
         # --- FIX: Removed 'batch' from query ---
         cursor.execute(
             'SELECT id, "Reg.No", name, section, department, phone_number, email, parent_mobile, parent_email FROM students WHERE "Reg.No" ILIKE %s OR name ILIKE %s ORDER BY name', 
@@ -607,7 +1213,7 @@ def get_students():
         cursor.close()
         
         conn.close()
-        return jsonify(students)
+        return etag_json_response(students, etag)
     except Exception as e:
         if conn: conn.close() 
         print(f"Error details in get_students: {e}") 
@@ -616,6 +1222,7 @@ def get_students():
 @app.route('/api/students', methods=['POST'])
 @token_required 
 def create_student():
+    import psycopg2.errors
     data = request.get_json()
     conn = None
     try:
@@ -690,12 +1297,18 @@ def get_templates():
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
+        etag = table_etag(cursor, 'templates')
+        matched = matching_etag(etag)
+        if matched:
+            cursor.close()
+            conn.close()
+            return not_modified_response(matched)
         cursor.execute("SELECT id, name, body FROM templates ORDER BY name")
         templates = [{'id': row[0], 'name': row[1], 'body': row[2]} for row in cursor.fetchall()]
         cursor.close()
      
         conn.close()
-        return jsonify(templates)
+        return etag_json_response(templates, etag)
     except Exception as e:
         if conn: conn.close()
         return jsonify({'error': str(e)}), 500
@@ -763,13 +1376,19 @@ def get_history():
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
+        etag = table_etag(cursor, 'history')
+        matched = matching_etag(etag)
+        if matched:
+            cursor.close()
+            conn.close()
+            return not_modified_response(matched)
         sql = 'SELECT id, student_reg_no, student_name, subject, body, recipients, sent_at, teacher_email FROM history WHERE student_reg_no ILIKE %s OR student_name ILIKE %s ORDER BY sent_at DESC'
         search_term = '%' + search_query + '%'
         cursor.execute(sql, (search_term, search_term))
         history_logs = [{'id': r[0],'student_reg_no': r[1],'student_name': r[2],'subject': r[3],'body': r[4],'recipients': r[5],'sent_at': r[6].isoformat(),'teacher_email': r[7]} for r in cursor.fetchall()]
         cursor.close()
         conn.close()
-        return jsonify(history_logs)
+        return etag_json_response(history_logs, etag)
     except Exception as e:
         if conn: conn.close()
   
@@ -778,18 +1397,21 @@ def get_history():
 @app.route('/api/export-excel-structured', methods=['POST'])
 @token_required
 def export_excel_structured():
+    import pandas as pd
     sorted_csv = request.get_json().get('sorted_csv_data', '')
     try:
-        df = pd.read_csv(StringIO(sorted_csv))
-        pivot_df = df.pivot_table(index='Reg.No', columns='Subject', values='Percentage').reset_index()
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-   
-            pivot_df.to_excel(writer, index=False, sheet_name='Low_Attendance_Pivot')
+        with timed('pandas.export_excel_structured'):
+            df = pd.read_csv(StringIO(sorted_csv))
+            pivot_df = df.pivot_table(index='Reg.No', columns='Subject', values='Percentage').reset_index()
+            output = BytesIO()
+            with pd.ExcelWriter(output, engine='openpyxl') as writer:
+       
+                pivot_df.to_excel(writer, index=False, sheet_name='Low_Attendance_Pivot')
         output.seek(0)
         return send_file(output, as_attachment=True, download_name='Structured_Attendance_Report.xlsx', mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
     except Exception as e:
         return jsonify({'error': f'Excel export failed: {e}'}), 500
         
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Development server only; production runs under gunicorn via wsgi.py.
+    app.run(host='0.0.0.0', port=5000, debug=os.environ.get('FLASK_DEBUG', '1') == '1')
@@ -0,0 +1,107 @@
+"""Concurrent login load test.
+
+Fires N logins at /api/auth/login from a pool of client threads and reports
+latency percentiles, so the same run can be compared before and after a change:
+
+    python benchmarks/login_load.py --email admin@example.com --password secret \
+        --concurrency 50 --requests 500 --label after
+"""
+import argparse
+import base64
+import json
+import math
+import os
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def latency_summary(latencies):
+    return {
+        'mean': round(statistics.mean(latencies), 2) if latencies else 0.0,
+        'p50': round(percentile(latencies, 50), 2),
+        'p90': round(percentile(latencies, 90), 2),
+        'p99': round(percentile(latencies, 99), 2),
+        'max': round(max(latencies), 2) if latencies else 0.0,
+    }
+
+
+def login_once(url, auth_header):
+    req = urllib.request.Request(url, method='POST', headers={'Authorization': auth_header})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except urllib.error.URLError:
+        status = 0
+    return time.perf_counter() - start, status
+
+
+def run(args):
+    url = args.url.rstrip('/') + '/api/auth/login'
+    auth_header = 'Basic ' + base64.b64encode(f"{args.email}:{args.password}".encode()).decode()
+
+    # Warm up the server (and its hashing pool) before measuring.
+    for _ in range(min(args.concurrency, 5)):
+        login_once(url, auth_header)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        samples = list(pool.map(lambda _: login_once(url, auth_header), range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    by_status = {}
+    for seconds, status in samples:
+        by_status.setdefault(str(status), []).append(seconds * 1000)
+    all_latencies = [seconds * 1000 for seconds, _ in samples]
+
+    return {
+        'label': args.label,
+        'concurrency': args.concurrency,
+        'requests': args.requests,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(args.requests / elapsed, 2) if elapsed else 0.0,
+        'success_rate': round(len(by_status.get('200', [])) / len(samples), 4) if samples else 0.0,
+        # Percentiles over every response, so fast 503 rejections can't hide slow logins;
+        # each status (200 logins, 503 rejections, ...) is also broken out on its own.
+        'latency_ms': latency_summary(all_latencies),
+        'by_status': {
+            status: dict(count=len(values), rate=round(len(values) / len(samples), 4), **latency_summary(values))
+            for status, values in sorted(by_status.items())
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent login latency benchmark.')
+    parser.add_argument('--url', default=os.environ.get('BENCH_URL', 'http://127.0.0.1:5000'))
+    parser.add_argument('--email', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--label', default='run')
+    parser.add_argument('--output', help='Append the result as a JSON line to this file.')
+    args = parser.parse_args()
+
+    result = run(args)
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'a') as f:
+            f.write(json.dumps(result) + '\n')
+
+
+if __name__ == '__main__':
+    main()
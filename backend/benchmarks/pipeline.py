@@ -0,0 +1,351 @@
+"""Reproducible benchmark suite for the attendance and mailing pipeline.
+
+Generates synthetic attendance PDFs, seeds a local PostgreSQL database with the
+matching students and drives the pipeline in-process through Flask's test
+client: process_pdf_to_csv_string, sort_attendance, fetch_details,
+export_excel_structured, send_emails and alert_all. Mail goes to a local
+SMTP sink. Every case reports latency percentiles, throughput, peak Python
+heap and process RSS (which also covers memory pdfminer, pandas and openpyxl
+allocate outside the Python heap). Results are always saved as JSON, by default
+to benchmarks/results/pipeline-<label>.json (after every dataset size, and with
+"partial": true if a case fails), so versions can be compared:
+
+    python benchmarks/pipeline.py --database-url postgresql://postgres@localhost/bench \
+        --students 100 1000 --label v1.4
+    python benchmarks/pipeline.py --database-url ... --compare benchmarks/results/pipeline-v1.4.json
+
+The database must be a throwaway one: the suite creates any missing tables and
+empties `students` and `history` before each run.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+sys.path.insert(0, BACKEND_DIR)
+
+from login_load import percentile
+from smtp_sink import SMTPSink
+from synthetic_pdf import generate_pdf
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS students (
+        id SERIAL PRIMARY KEY, "Reg.No" TEXT UNIQUE NOT NULL, name TEXT, section TEXT, department TEXT,
+        phone_number TEXT, email TEXT, parent_mobile TEXT, parent_email TEXT)""",
+    """CREATE TABLE IF NOT EXISTS teachers (
+        id SERIAL PRIMARY KEY, name TEXT, email TEXT UNIQUE NOT NULL, password_hash TEXT, is_admin BOOLEAN DEFAULT FALSE)""",
+    "CREATE TABLE IF NOT EXISTS templates (id SERIAL PRIMARY KEY, name TEXT, body TEXT)",
+    """CREATE TABLE IF NOT EXISTS history (
+        id SERIAL PRIMARY KEY, student_reg_no TEXT, student_name TEXT, subject TEXT, body TEXT,
+        recipients TEXT, sent_at TIMESTAMP NOT NULL DEFAULT NOW(), teacher_email TEXT)""",
+    """CREATE TABLE IF NOT EXISTS dashboard_analytics (
+        id INTEGER PRIMARY KEY, emails_sent_today INTEGER, unique_students_contacted INTEGER,
+        most_frequent_subject TEXT, last_updated TIMESTAMP)""",
+    "INSERT INTO dashboard_analytics (id, emails_sent_today, unique_students_contacted) VALUES (1, 0, 0) ON CONFLICT DO NOTHING",
+)
+
+EMAIL_BODY = "Dear [Student Name],\nYour attendance is below the required 75%.\nPlease meet your faculty advisor."
+
+
+def configure_environment(args, smtp_port):
+    os.environ['DATABASE_URL'] = args.database_url
+    os.environ['SMTP_HOST'] = '127.0.0.1'
+    os.environ['SMTP_PORT'] = str(smtp_port)
+    os.environ['SMTP_STARTTLS'] = '0'
+
+
+def prepare_database(app_module, rows):
+    from psycopg2.extras import execute_values
+    conn = app_module.get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            for statement in SCHEMA:
+                cursor.execute(statement)
+        conn.commit()
+        app_module.migrate_history_to_partitions(conn)
+        app_module.install_table_version_triggers(conn)
+        with conn.cursor() as cursor:
+            cursor.execute("TRUNCATE students, history RESTART IDENTITY")
+            execute_values(cursor, 'INSERT INTO students ("Reg.No", name, section, department, phone_number, email, parent_mobile, parent_email) VALUES %s', [
+                (reg, f"Student {reg[-5:]}", 'A', 'CSE', '9000000000', f"{reg.lower()}@students.example.com", '9000000001', f"parent.{reg.lower()}@example.com")
+                for reg, _ in rows
+            ])
+        conn.commit()
+    finally:
+        conn.close()
+    app_module.ensure_history_partitions()
+
+
+def truncate_history(app_module):
+    conn = app_module.get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("TRUNCATE history")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def current_rss_kib():
+    """Resident set size of this process, or None where /proc is unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def max_rss_kib():
+    """Process lifetime RSS high-water mark (ru_maxrss is bytes on macOS, KiB elsewhere)."""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss // 1024 if sys.platform == 'darwin' else maxrss
+
+
+class RSSSampler:
+    """Samples RSS in the background to find a case's peak, since ru_maxrss only
+    ever reports the whole process's high-water mark."""
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.start_kib = self.peak_kib = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start_kib = self.peak_kib = current_rss_kib()
+        if self.start_kib is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_kib = max(self.peak_kib, current_rss_kib() or 0)
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self.peak_kib = max(self.peak_kib, current_rss_kib() or 0)
+
+
+def measure(fn, iterations, reset=None):
+    """Times `fn` over `iterations` runs after one warm-up while sampling RSS, then
+    repeats it once under tracemalloc for peak Python heap so tracing does not skew
+    the timings. Returns (timings, peak_heap_bytes, rss)."""
+    def run_once():
+        if reset:
+            reset()
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        return time.perf_counter() - start
+
+    run_once()
+    maxrss_before = max_rss_kib()
+    with RSSSampler() as sampler:
+        timings = [run_once() for _ in range(iterations)]
+    maxrss_after = max_rss_kib()
+    if sampler.start_kib is not None:
+        rss = {'peak_rss_kib': sampler.peak_kib, 'rss_delta_kib': sampler.peak_kib - sampler.start_kib}
+    else:
+        rss = {'peak_rss_kib': maxrss_after, 'rss_delta_kib': maxrss_after - maxrss_before}
+    rss['max_rss_kib'] = maxrss_after
+
+    if reset:
+        reset()
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return timings, peak, rss
+
+
+def summarize(case, students, items, timings, peak, rss):
+    ms = [t * 1000 for t in timings]
+    median_s = statistics.median(timings)
+    return {
+        'case': case,
+        'students': students,
+        'items': items,
+        'iterations': len(timings),
+        'latency_ms': {
+            'mean': round(statistics.mean(ms), 3),
+            'min': round(min(ms), 3),
+            'p50': round(percentile(ms, 50), 3),
+            'p90': round(percentile(ms, 90), 3),
+            'p99': round(percentile(ms, 99), 3),
+            'max': round(max(ms), 3),
+        },
+        'throughput_items_per_s': round(items / median_s, 2) if median_s else 0.0,
+        'peak_heap_kib': round(peak / 1024, 1),
+        **rss,
+    }
+
+
+def expect_ok(response, case):
+    if response.status_code != 200:
+        raise RuntimeError(f"{case} returned {response.status_code}: {response.get_data(as_text=True)[:300]}")
+    return response
+
+
+def run_size(app_module, client, headers, students, args, results):
+    """Appends one result per case to `results` as soon as it finishes."""
+    pdf_bytes, rows = generate_pdf(students, args.subjects, args.low_ratio, args.seed)
+    prepare_database(app_module, rows)
+
+    def bench(case, items, fn, reset=None):
+        timings, peak, rss = measure(fn, args.iterations, reset)
+        result = summarize(case, students, items, timings, peak, rss)
+        results.append(result)
+        print(f"  {case:<28} p50 {result['latency_ms']['p50']:>10.2f} ms  p99 {result['latency_ms']['p99']:>10.2f} ms  "
+              f"{result['throughput_items_per_s']:>10.1f} items/s  heap {result['peak_heap_kib']:>9.1f} KiB  "
+              f"rss +{result['rss_delta_kib']:>7} KiB")
+
+    csv_data = app_module.process_pdf_to_csv_string(BytesIO(pdf_bytes))
+    bench('process_pdf_to_csv_string', students, lambda: app_module.process_pdf_to_csv_string(BytesIO(pdf_bytes)))
+
+    sorted_csv = expect_ok(client.post('/api/sort-attendance', json={'csv_data': csv_data}, headers=headers), 'sort_attendance').get_json()['sorted_csv_data']
+    bench('sort_attendance', students,
+          lambda: expect_ok(client.post('/api/sort-attendance', json={'csv_data': csv_data}, headers=headers), 'sort_attendance'))
+
+    details = expect_ok(client.post('/api/fetch-details', json={'sorted_csv_data': sorted_csv}, headers=headers), 'fetch_details').get_json()
+    bench('fetch_details', len(details),
+          lambda: expect_ok(client.post('/api/fetch-details', json={'sorted_csv_data': sorted_csv}, headers=headers), 'fetch_details'))
+
+    bench('export_excel_structured', len(details),
+          lambda: expect_ok(client.post('/api/export-excel-structured', json={'sorted_csv_data': sorted_csv}, headers=headers), 'export_excel_structured'))
+
+    email_data = [dict(d, subject='Attendance Notification', email_body=EMAIL_BODY.replace('[Student Name]', d['name'] or 'Student')) for d in details]
+    send_payload = json.dumps({'email_data': email_data, 'sender_email': 'bench@example.com', 'sender_password': 'bench'})
+
+    def send_emails():
+        response = expect_ok(client.post('/api/send-emails', data={'email_payload': send_payload}, headers=headers), 'send_emails')
+        failed = [r for r in response.get_json()['results'] if r['status'] != 'success']
+        if failed:
+            raise RuntimeError(f"send_emails failed for {len(failed)} students: {failed[0]}")
+
+    bench('send_emails', len(email_data), send_emails, reset=lambda: truncate_history(app_module))
+
+    alert_payload = json.dumps({'sender_email': 'bench@example.com', 'sender_password': 'bench', 'subject': 'Notice', 'email_body': EMAIL_BODY})
+
+    def alert_all():
+        response = expect_ok(client.post('/api/alert-all', data={'alert_payload': alert_payload}, headers=headers), 'alert_all')
+        if response.get_json()['results']['fail_count']:
+            raise RuntimeError(f"alert_all failed: {response.get_json()['results']}")
+
+    bench('alert_all', students, alert_all, reset=lambda: truncate_history(app_module))
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def save_report(report, output, partial):
+    report['meta']['partial'] = partial
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    tmp_path = output + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, output)
+
+
+def compare(current, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r['case'], r['students']): r for r in baseline['results']}
+    partial = ' [partial run]' if baseline['meta'].get('partial') else ''
+    print(f"\nCompared with {baseline['meta'].get('label')} ({baseline['meta'].get('git_revision')}){partial}:")
+    print(f"  {'case':<28} {'students':>8} {'p50 ms':>10} {'was':>10} {'change':>8} {'items/s change':>15} {'rss KiB change':>15}")
+    for r in current['results']:
+        old = previous.get((r['case'], r['students']))
+        if not old:
+            continue
+        p50, old_p50 = r['latency_ms']['p50'], old['latency_ms']['p50']
+        p50_change = (p50 - old_p50) / old_p50 * 100 if old_p50 else 0.0
+        tput, old_tput = r['throughput_items_per_s'], old['throughput_items_per_s']
+        tput_change = (tput - old_tput) / old_tput * 100 if old_tput else 0.0
+        # Results saved before RSS was recorded have no rss_delta_kib.
+        rss_change = f"{r['rss_delta_kib'] - old['rss_delta_kib']:+d}" if 'rss_delta_kib' in old else 'n/a'
+        print(f"  {r['case']:<28} {r['students']:>8} {p50:>10.2f} {old_p50:>10.2f} {p50_change:>+7.1f}% {tput_change:>+14.1f}% {rss_change:>15}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the attendance and mailing pipeline.')
+    parser.add_argument('--database-url', default=os.environ.get('BENCH_DATABASE_URL'), help='Throwaway PostgreSQL database (or set BENCH_DATABASE_URL).')
+    parser.add_argument('--students', type=int, nargs='+', default=[100, 1000], help='Dataset sizes to run.')
+    parser.add_argument('--subjects', type=int, default=6, help='Subjects per student.')
+    parser.add_argument('--low-ratio', type=float, default=0.3, help='Share of marks below 75%%.')
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--label', default='run')
+    parser.add_argument('--output', help='Write the results as JSON to this file (default: results/pipeline-<label>.json).')
+    parser.add_argument('--compare', help='Earlier results file to compare against.')
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error('--database-url or BENCH_DATABASE_URL is required')
+
+    # The app's short development SECRET_KEY makes PyJWT warn on every request.
+    warnings.filterwarnings('ignore', message='The HMAC key')
+    sink = SMTPSink().start()
+    configure_environment(args, sink.port)
+    import app as app_module
+
+    token = app_module.jwt.encode({
+        'id': 1, 'user': 'bench@example.com', 'name': 'Benchmark', 'is_admin': True,
+        'exp': datetime.now(timezone.utc) + timedelta(hours=1),
+    }, app_module.app.config['SECRET_KEY'], algorithm="HS256")
+    headers = {'x-access-token': token}
+    client = app_module.app.test_client()
+
+    report = {
+        'meta': {
+            'label': args.label,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'params': {k: v for k, v in vars(args).items() if k not in ('database_url', 'output', 'compare')},
+        },
+        'results': [],
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline-{args.label}.json")
+    # Saved after every dataset size and again if a case fails, so a crash keeps every
+    # case that already finished; `partial` is only cleared once every size has run.
+    try:
+        for students in args.students:
+            print(f"{students} students:")
+            run_size(app_module, client, headers, students, args, report['results'])
+            save_report(report, output, partial=True)
+        save_report(report, output, partial=False)
+    except BaseException as e:
+        report['meta']['error'] = f"{type(e).__name__}: {e}"
+        save_report(report, output, partial=True)
+        raise
+    finally:
+        sink.stop()
+        print(f"\nSaved results to {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
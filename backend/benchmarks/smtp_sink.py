@@ -0,0 +1,97 @@
+"""Local stand-in SMTP server for benchmarks.
+
+Accepts any AUTH PLAIN/LOGIN credentials and swallows every message. It
+counts deliveries and does nothing else, so benchmark numbers reflect the
+backend rather than a real mail relay. Point the backend at it with
+SMTP_HOST/SMTP_PORT and SMTP_STARTTLS=0.
+"""
+import socketserver
+import threading
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.reply("220 localhost benchmark SMTP sink")
+        recipients = 0
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            line = raw.decode('utf-8', 'replace').rstrip('\r\n')
+            verb = line.split(' ', 1)[0].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.wfile.write(b"250-localhost\r\n250-AUTH PLAIN LOGIN\r\n250-8BITMIME\r\n250 SIZE 52428800\r\n")
+            elif verb == 'AUTH':
+                parts = line.split()
+                if len(parts) >= 2 and parts[1].upper() == 'LOGIN':
+                    # Username then password, each prompted for separately.
+                    self.reply("334 VXNlcm5hbWU6")
+                    self.rfile.readline()
+                    self.reply("334 UGFzc3dvcmQ6")
+                    self.rfile.readline()
+                elif len(parts) == 2:
+                    self.reply("334 ")
+                    self.rfile.readline()
+                self.reply("235 2.7.0 Authentication successful")
+            elif verb == 'MAIL':
+                recipients = 0
+                self.reply("250 OK")
+            elif verb == 'RCPT':
+                recipients += 1
+                self.reply("250 OK")
+            elif verb == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk == b".\r\n":
+                        break
+                    size += len(chunk)
+                self.server.record(recipients, size)
+                self.reply("250 OK queued")
+            elif verb in ('RSET', 'NOOP'):
+                self.reply("250 OK")
+            elif verb == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), _SMTPHandler)
+        self._lock = threading.Lock()
+        self.messages = 0
+        self.recipients = 0
+        self.bytes = 0
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def record(self, recipients, size):
+        with self._lock:
+            self.messages += 1
+            self.recipients += recipients
+            self.bytes += size
+
+    def reset(self):
+        with self._lock:
+            self.messages = self.recipients = self.bytes = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,91 @@
+"""Import time and worker cold-start benchmark.
+
+Each sample runs in a fresh interpreter so nothing is cached between runs:
+
+* import     - time to `import app`
+* cold_start - import plus the first request to a route that needs no database
+* preloaded  - first request in a process forked after `wsgi` was imported,
+               which is what a gunicorn worker sees with preload_app enabled
+
+    python benchmarks/startup_time.py --runs 10 --label after --output startup.jsonl
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = """
+import time
+t0 = time.perf_counter()
+import app
+print(time.perf_counter() - t0)
+"""
+
+COLD_START_SNIPPET = """
+import time
+t0 = time.perf_counter()
+import app
+app.app.test_client().post('/api/auth/login')
+print(time.perf_counter() - t0)
+"""
+
+PRELOADED_SNIPPET = """
+import os, time
+import wsgi
+r, w = os.pipe()
+pid = os.fork()
+if pid == 0:
+    t0 = time.perf_counter()
+    wsgi.app.test_client().post('/api/auth/login')
+    os.write(w, str(time.perf_counter() - t0).encode())
+    os._exit(0)
+os.waitpid(pid, 0)
+print(os.read(r, 64).decode())
+"""
+
+SNIPPETS = {
+    'import': IMPORT_SNIPPET,
+    'cold_start': COLD_START_SNIPPET,
+    'preloaded': PRELOADED_SNIPPET,
+}
+
+
+def sample(snippet):
+    out = subprocess.run(
+        [sys.executable, '-c', snippet],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1]) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure backend import and cold-start time.')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--label', default='run')
+    parser.add_argument('--skip-preloaded', action='store_true', help='Skip the fork-based measurement (needs wsgi.py and os.fork).')
+    parser.add_argument('--output', help='Append the result as a JSON line to this file.')
+    args = parser.parse_args()
+
+    result = {'label': args.label, 'runs': args.runs}
+    for name, snippet in SNIPPETS.items():
+        if name == 'preloaded' and (args.skip_preloaded or not hasattr(os, 'fork')):
+            continue
+        timings = [sample(snippet) for _ in range(args.runs)]
+        result[name + '_ms'] = {
+            'median': round(statistics.median(timings), 2),
+            'min': round(min(timings), 2),
+            'max': round(max(timings), 2),
+        }
+
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'a') as f:
+            f.write(json.dumps(result) + '\n')
+
+
+if __name__ == '__main__':
+    main()
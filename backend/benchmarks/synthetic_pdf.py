@@ -0,0 +1,91 @@
+"""Synthetic attendance report PDFs in the layout process_pdf_to_csv_string expects.
+
+Each student row carries a `RA` + 13 digit register number followed by
+subject-code / percentage pairs (e.g. `21CSC201J 82.50`). Rows are wrapped in
+the `S.No` header and `Total Students` footer of the real report. The PDF is
+written by hand with the standard Helvetica font so no extra dependency is
+needed to generate it.
+"""
+import random
+from io import BytesIO
+
+SUBJECT_CODES = (
+    '21CSC201J', '21CSC202J', '21CSC203P', '21MAB201T', '21MAB204T', '21CSE251T',
+    '21CSE253T', '21PDH209T', '21DCS201P', '21LEM202T', '21CSC204J', '21CSC205P',
+)
+ROWS_PER_PAGE = 60
+
+
+def reg_no(index):
+    return f"RA21110030{index:05d}"
+
+
+def generate_rows(students, subjects_per_student=6, low_ratio=0.3, seed=0):
+    """Returns [(reg_no, [(subject, percentage), ...]), ...]. Roughly `low_ratio`
+    of the (student, subject) pairs fall below the 75% cut-off."""
+    rng = random.Random(seed)
+    subjects = SUBJECT_CODES[:subjects_per_student]
+    rows = []
+    for i in range(1, students + 1):
+        marks = []
+        for code in subjects:
+            if rng.random() < low_ratio:
+                pct = rng.uniform(40, 74.99)
+            else:
+                pct = rng.uniform(75, 100)
+            marks.append((code, f"{pct:.2f}"))
+        rows.append((reg_no(i), marks))
+    return rows
+
+
+def _escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def _page_stream(lines):
+    ops = ['BT', '/F1 7 Tf', '9 TL', '30 800 Td']
+    for line in lines:
+        ops.append(f"({_escape(line)}) Tj T*")
+    ops.append('ET')
+    return '\n'.join(ops).encode('latin-1')
+
+
+def build_pdf(rows):
+    """Renders `rows` (as returned by generate_rows) to PDF bytes."""
+    lines = [f"{n}  {reg}  " + '  '.join(f"{code} {pct}" for code, pct in marks) for n, (reg, marks) in enumerate(rows, 1)]
+    pages = [lines[i:i + ROWS_PER_PAGE] for i in range(0, len(lines), ROWS_PER_PAGE)] or [[]]
+    pages[0] = ['S.No  Reg.No  Subject Attendance %'] + pages[0]
+    pages[-1] = pages[-1] + [f"Total Students: {len(rows)}"]
+
+    # Object layout: 1 catalog, 2 page tree, 3 font, then a (page, content) pair per page.
+    objects = [None, None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page_lines in pages:
+        stream = _page_stream(page_lines)
+        page_id = len(objects) + 1
+        page_ids.append(page_id)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>".encode()
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    kids = ' '.join(f"{pid} 0 R" for pid in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()
+
+    out = BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        out.write(f"{offset:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return out.getvalue()
+
+
+def generate_pdf(students, subjects_per_student=6, low_ratio=0.3, seed=0):
+    rows = generate_rows(students, subjects_per_student, low_ratio, seed)
+    return build_pdf(rows), rows
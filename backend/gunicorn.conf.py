@@ -0,0 +1,40 @@
+import glob
+import multiprocessing
+import os
+import tempfile
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+
+# Every worker owns a password hashing pool (see app.py). Split the CPUs and the
+# queue-depth budget between workers instead of giving each worker the whole box.
+# Set PASSWORD_HASH_WORKERS / PASSWORD_HASH_MAX_PENDING to override the per-worker values.
+os.environ.setdefault('PASSWORD_HASH_WORKERS', str(max(1, multiprocessing.cpu_count() // workers)))
+os.environ.setdefault('PASSWORD_HASH_MAX_PENDING', str(max(2, 32 // workers)))
+
+# Import the app (and its dependencies) once in the master before forking workers.
+preload_app = True
+# Mail sends to every student can run for a while.
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 300))
+graceful_timeout = 30
+keepalive = 5
+max_requests = 1000
+max_requests_jitter = 100
+accesslog = '-'
+
+# prometheus_client multiprocess mode: workers write metric samples to this directory
+# and /metrics merges them. It has to be set before the app is imported (preload), and
+# samples from a previous run must not leak into this one.
+if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+    for stale in glob.glob(os.path.join(os.environ['PROMETHEUS_MULTIPROC_DIR'], '*.db')):
+        os.remove(stale)
+else:
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='monitormail-metrics-')
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,9 @@
+"""Production entry point: gunicorn -c gunicorn.conf.py wsgi:app"""
+import os
+
+from app import app, preload_heavy_modules
+
+# With preload_app the master imports this module once and forks the workers from
+# it, so pulling the heavy modules in here shares them copy-on-write across workers.
+if os.environ.get('PRELOAD_HEAVY_MODULES', '1') == '1':
+    preload_heavy_modules()